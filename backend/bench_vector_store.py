@@ -0,0 +1,98 @@
+"""
+Recall vs latency benchmark for QuantizedVectorStore on synthetic clustered embeddings.
+
+Ground truth is an exact float32 brute-force search. Reports recall@k, p50/p95 query
+latency and on-disk vector size (vectors.bin, plus hnsw.bin in HNSW mode) for each
+dtype and index setting.
+
+Usage:
+    python bench_vector_store.py --n 100000 --dim 1536 --queries 200
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from vector_store import QuantizedVectorStore, hnswlib
+
+def synthetic_embeddings(n: int, dim: int, clusters: int, rng) -> np.ndarray:
+    # Real text embeddings are clustered by topic; uniform random vectors would make ANN look worse than it is
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    data = centers[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+def exact_top_k(data: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ data.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return top
+
+def run(store: QuantizedVectorStore, queries: np.ndarray, truth: np.ndarray, k: int):
+    latencies, hits = [], 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        result = store.query(query_embeddings=[query], n_results=k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        found = {int(item_id) for item_id in result["ids"][0]}
+        hits += len(found & set(expected.tolist()))
+    latencies = np.array(latencies)
+    return hits / truth.size, np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+def main():
+    parser = argparse.ArgumentParser(description="QuantizedVectorStore recall/latency benchmark")
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(f"Generating {args.n} x {args.dim} vectors...")
+    data = synthetic_embeddings(args.n, args.dim, args.clusters, rng)
+    queries = synthetic_embeddings(args.queries, args.dim, args.clusters, rng)
+
+    started = time.perf_counter()
+    truth = exact_top_k(data, queries, args.k)
+    brute_ms = (time.perf_counter() - started) * 1000 / args.queries
+    print(f"float32 brute force: {brute_ms:.2f} ms/query, {data.nbytes / 2**20:.0f} MiB\n")
+
+    print(f"{'dtype':<8} {'index':<6} {'setting':<12} {'recall@' + str(args.k):<10} {'p50 ms':<8} {'p95 ms':<8} {'disk MiB':<8}")
+    workdir = tempfile.mkdtemp(prefix="bench_vector_store_")
+    try:
+        indexes = ["ivf"] + (["hnsw"] if hnswlib is not None else [])
+        for dtype in ["float16", "int8"]:
+            for index in indexes:
+                path = os.path.join(workdir, f"{dtype}_{index}")
+                store = QuantizedVectorStore(path, dtype=dtype, index=index, auto_train=False)
+                ids = [str(i) for i in range(args.n)]
+                for start in range(0, args.n, 10000):
+                    end = min(start + 10000, args.n)
+                    store.add(ids=ids[start:end], documents=[""] * (end - start), embeddings=data[start:end])
+                if index == "ivf":
+                    store.build_index()
+                store.flush()
+                disk_mib = os.path.getsize(os.path.join(path, "vectors.bin")) * args.n / store.meta["capacity"] / 2**20
+                hnsw_path = os.path.join(path, "hnsw.bin")
+                if os.path.exists(hnsw_path):
+                    # hnswlib stores its own float32 copy of every vector next to the graph
+                    disk_mib += os.path.getsize(hnsw_path) / 2**20
+
+                settings = [1, 4, 16, 64] if index == "ivf" else [16, 64, 256]
+                for setting in settings:
+                    if index == "ivf":
+                        store.nprobe = setting
+                        label = f"nprobe={setting}"
+                    else:
+                        store.hnsw_ef = setting
+                        label = f"ef={setting}"
+                    recall, p50, p95 = run(store, queries, truth, args.k)
+                    print(f"{dtype:<8} {index:<6} {label:<12} {recall:<10.3f} {p50:<8.2f} {p95:<8.2f} {disk_mib:<8.0f}")
+                store.db.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
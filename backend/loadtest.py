@@ -0,0 +1,215 @@
+"""
+Load test for the FastAPI backend.
+
+Starts server.app in-process with a stub MemoryManager and ToolBox, and stub modules in
+place of the audio, Whisper and Chroma/LangChain imports (none of them need be installed), keeps simulated audio/transcription threads busy, then drives
+/ingest-browser, /ingest-batch, /api/external-command and the /ws/live-stream websocket
+concurrently. Reports throughput and p50/p95/p99 latency per endpoint.
+
+Usage:
+    python loadtest.py --duration 20 --concurrency 16
+    python loadtest.py --max-p99-ms 250   # exit code 1 if any endpoint is slower (for CI)
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import types
+import asyncio
+import argparse
+import threading
+import numpy as np
+import requests
+import websockets
+import uvicorn
+
+API_KEY = "loadtest"
+
+class StubMemoryManager:
+    """Stands in for MemoryManager; blocks for about as long as an embedding call plus a Chroma write."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add_memory(self, text, source, metadata={}):
+        time.sleep(self.latency)
+        with self._lock:
+            self.count += 1
+
+    def add_memories(self, items):
+        time.sleep(self.latency)
+        with self._lock:
+            self.count += len(items)
+
+    def query_brain(self, user_query):
+        time.sleep(self.latency * 4)
+        return "stub answer"
+
+    def close(self):
+        pass
+
+class StubToolBox:
+    def execute_system_command(self, command):
+        return {"stdout": "", "stderr": "", "returncode": 0}
+
+    def read_error_logs(self, limit=10):
+        return []
+
+def busy_audio_thread(stop: threading.Event):
+    """Approximates Whisper on CPU: numpy work that holds the GIL part of the time."""
+    rng = np.random.default_rng()
+    a = rng.standard_normal((256, 256)).astype(np.float32)
+    while not stop.is_set():
+        for _ in range(20):
+            a = np.tanh(a @ a.T / 256)
+        time.sleep(0.001)
+
+def install_stub_modules():
+    """Registers empty modules for server's heavy imports; the load test never calls into them."""
+    stubs = {
+        "pyaudio": {},
+        "webrtcvad_wheels": {},
+        "soundcard": {},
+        "faster_whisper": {"WhisperModel": None},
+        "memory_manager": {"MemoryManager": StubMemoryManager}, # Pulls in chromadb and langchain
+    }
+    for name, attrs in stubs.items():
+        module = types.ModuleType(name)
+        module.__dict__.update(attrs)
+        sys.modules[name] = module
+
+def start_server(host: str, port: int, latency: float, audio_threads: int, stop: threading.Event):
+    install_stub_modules()
+    import server
+
+    # Swap the real startup (models, audio devices) for stubs; keep executor configuration
+    server.app.router.on_startup.remove(server.startup_event)
+
+    @server.app.on_event("startup")
+    def stub_startup():
+        server.memory_manager = StubMemoryManager(latency)
+        server.toolbox = StubToolBox()
+        for _ in range(audio_threads):
+            threading.Thread(target=busy_audio_thread, args=(stop,), daemon=True).start()
+
+    os.environ["EXTERNAL_API_KEY"] = API_KEY
+    uv_server = uvicorn.Server(uvicorn.Config(server.app, host=host, port=port, log_level="warning"))
+    threading.Thread(target=uv_server.run, daemon=True).start()
+    while not uv_server.started:
+        time.sleep(0.05)
+    return uv_server
+
+# --- Drivers ---
+
+def browser_payload():
+    return {"url": f"https://example.com/{uuid.uuid4().hex}", "title": "Load test page", "content": "lorem ipsum " * 100}
+
+def batch_payload():
+    return {"items": [
+        {"id": uuid.uuid4().hex, "text": "load test turn " * 20, "host": "chatgpt.com",
+         "direction": "in", "conversation": "c1", "timestamp": time.time()}
+        for _ in range(20)
+    ]}
+
+ENDPOINTS = {
+    "POST /ingest-browser": ("/ingest-browser", browser_payload, {}),
+    "POST /ingest-batch": ("/ingest-batch", batch_payload, {}),
+    "POST /api/external-command": ("/api/external-command", lambda: {"command": "status"}, {"X-API-Key": API_KEY}),
+}
+
+def http_worker(base_url, name, deadline, results, errors):
+    path, make_payload, headers = ENDPOINTS[name]
+    session = requests.Session()
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            response = session.post(base_url + path, json=make_payload(), headers=headers, timeout=30)
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        elapsed = (time.perf_counter() - started) * 1000
+        if ok:
+            results[name].append(elapsed)
+        else:
+            errors[name] += 1
+
+async def ws_client(ws_url, deadline, results, errors):
+    # The server stamps each status message; lag past that stamp is time the event loop was busy
+    try:
+        async with websockets.connect(ws_url) as ws:
+            while time.time() < deadline:
+                message = json.loads(await asyncio.wait_for(ws.recv(), timeout=10))
+                results["WS /ws/live-stream"].append((time.time() - message["timestamp"]) * 1000)
+    except Exception:
+        errors["WS /ws/live-stream"] += 1
+
+def ws_worker(ws_url, clients, deadline, results, errors):
+    async def run():
+        await asyncio.gather(*(ws_client(ws_url, deadline, results, errors) for _ in range(clients)))
+    asyncio.run(run())
+
+# --- Report ---
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+def report(results, errors, duration, max_p99_ms):
+    print(f"\n{'endpoint':<30} {'count':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    failed = False
+    for name, latencies in results.items():
+        latencies = sorted(latencies)
+        if not latencies:
+            print(f"{name:<30} {0:>7} {errors[name]:>5}")
+            failed = True
+            continue
+        p50, p95, p99 = (percentile(latencies, q) for q in (50, 95, 99))
+        print(f"{name:<30} {len(latencies):>7} {errors[name]:>5} {len(latencies) / duration:>8.1f} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f}")
+        if max_p99_ms is not None and p99 > max_p99_ms:
+            failed = True
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend load test")
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--concurrency", type=int, default=8, help="HTTP clients per endpoint")
+    parser.add_argument("--ws-clients", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated blocking time of MemoryManager calls (s)")
+    parser.add_argument("--audio-threads", type=int, default=2, help="Simulated busy audio/transcription threads")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-p99-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    uv_server = start_server("127.0.0.1", args.port, args.latency, args.audio_threads, stop)
+    base_url = f"http://127.0.0.1:{args.port}"
+    print(f"Driving {base_url} for {args.duration:.0f}s: {args.concurrency} clients x {len(ENDPOINTS)} endpoints, "
+          f"{args.ws_clients} websocket clients, {args.audio_threads} busy audio threads")
+
+    results = {name: [] for name in list(ENDPOINTS) + ["WS /ws/live-stream"]}
+    errors = {name: 0 for name in results}
+    deadline = time.time() + args.duration
+    workers = [
+        threading.Thread(target=http_worker, args=(base_url, name, deadline, results, errors))
+        for name in ENDPOINTS for _ in range(args.concurrency)
+    ]
+    workers.append(threading.Thread(
+        target=ws_worker,
+        args=(f"ws://127.0.0.1:{args.port}/ws/live-stream", args.ws_clients, deadline, results, errors)
+    ))
+    started = time.time()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    duration = time.time() - started
+
+    stop.set()
+    uv_server.should_exit = True
+    failed = report(results, errors, duration, args.max_p99_ms)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
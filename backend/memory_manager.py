@@ -1,14 +1,27 @@
 import os
 import time
 from typing import List, Dict
+import tiktoken
 import chromadb
 from chromadb.utils import embedding_functions
 from langchain.chat_models import ChatOpenAI
 from langchain.schema import SystemMessage, HumanMessage
 
+from recency_index import RecencyIndex, is_recency_query
+from vector_store import QuantizedVectorStore
+
 # Ensure you have OPENAI_API_KEY in your environment variables
 # For now, we will assume it is set. If not, this will error.
 
+# Decayed similarity a recent segment needs to answer a recency question on its own;
+# below it the ring has nothing relevant and stream_context in Chroma is searched instead
+RECENT_AUDIO_MIN_SCORE = 0.2
+
+# text-embedding-3-small accepts 8191 tokens per input and about 300k per request
+EMBED_MAX_TOKENS = 8000
+EMBED_BATCH_TOKENS = 250000
+EMBED_BATCH_INPUTS = 2048
+
 class MemoryManager:
     def __init__(self):
         print("[MemoryManager] Initializing...")
@@ -21,6 +34,7 @@ class MemoryManager:
             api_key=os.environ.get("OPENAI_API_KEY"),
             model_name="text-embedding-3-small"
         )
+        self.tokenizer = tiktoken.encoding_for_model("text-embedding-3-small")
 
         # Collections
         # 1. Stream Context: Short-term memory of what the system hears
@@ -30,10 +44,24 @@ class MemoryManager:
         )
         
         # 2. Long Term History: Persistent knowledge (e.g., browser history, important facts)
-        self.long_term_history = self.chroma_client.get_or_create_collection(
-            name="long_term_history",
-            embedding_function=self.openai_ef
-        )
+        # LONG_TERM_STORE=quantized keeps it in a compact memory-mapped store instead of Chroma
+        # (migrate existing data with migrate_chroma.py).
+        if os.environ.get("LONG_TERM_STORE", "chroma") == "quantized":
+            self.long_term_history = QuantizedVectorStore(
+                path="./vector_store/long_term_history",
+                embedding_function=self.openai_ef,
+                dtype=os.environ.get("LONG_TERM_DTYPE", "int8"),
+                index=os.environ.get("LONG_TERM_INDEX", "ivf")
+            )
+        else:
+            self.long_term_history = self.chroma_client.get_or_create_collection(
+                name="long_term_history",
+                embedding_function=self.openai_ef
+            )
+
+        # 3. Recent Audio: In-process ring of the last few minutes of stream_context,
+        # so "what did I just hear" never has to go through Chroma.
+        self.recent_audio = RecencyIndex(window_seconds=600)
         
         # Initialize LLM (GPT-4o)
         self.llm = ChatOpenAI(
@@ -61,11 +89,15 @@ class MemoryManager:
         documents = [text]
         
         if source == "system":
+            # Embed once and share the vector between Chroma and the recency ring
+            embedding = list(self.openai_ef([text])[0])
             self.stream_context.add(
                 ids=ids,
                 documents=documents,
-                metadatas=[meta]
+                metadatas=[meta],
+                embeddings=[embedding]
             )
+            self.recent_audio.add(text, embedding, timestamp)
             print(f"[Memory] Added to Stream Context: {text[:50]}...")
         else:
             self.long_term_history.add(
@@ -75,32 +107,110 @@ class MemoryManager:
             )
             print(f"[Memory] Added to Long Term History: {text[:50]}...")
 
+    def add_memories(self, items: List[Dict]):
+        """
+        Adds many memories at once: one embedding call and one collection add per destination.
+        Each item has 'text', 'source', and optionally 'id' and 'metadata'. Items that reuse an
+        existing id are ignored by the collection, so callers can pass content hashes as ids.
+        """
+        items = [item for item in items if item.get("text") and item["text"].strip()]
+        if not items:
+            return
+
+        timestamp = time.time()
+        for is_stream in (True, False):
+            group = [item for item in items if (item["source"] == "system") == is_stream]
+            if not group:
+                continue
+
+            ids, documents, metadatas, token_counts = [], [], [], []
+            for i, item in enumerate(group):
+                meta = dict(item.get("metadata") or {})
+                meta.setdefault("timestamp", timestamp)
+                meta["source"] = item["source"]
+                ids.append(item.get("id") or f"{item['source']}_{timestamp}_{i}")
+                # Cut by tokens, not characters: 8000 CJK characters can exceed the model's limit
+                tokens = self.tokenizer.encode(item["text"], disallowed_special=())
+                if len(tokens) > EMBED_MAX_TOKENS:
+                    tokens = tokens[:EMBED_MAX_TOKENS]
+                    documents.append(self.tokenizer.decode(tokens))
+                else:
+                    documents.append(item["text"])
+                token_counts.append(len(tokens))
+                metadatas.append(meta)
+            embeddings = self._embed_in_batches(documents, token_counts)
+
+            collection = self.stream_context if is_stream else self.long_term_history
+            collection.add(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+            if is_stream:
+                for document, embedding, meta in zip(documents, embeddings, metadatas):
+                    self.recent_audio.add(document, embedding, meta["timestamp"])
+            print(f"[Memory] Added {len(group)} items to {'Stream Context' if is_stream else 'Long Term History'}")
+
+    def _embed_in_batches(self, documents: List[str], token_counts: List[int]) -> List[List[float]]:
+        """Embeds documents in as few calls as the per-request token and input limits allow."""
+        embeddings, start, tokens = [], 0, 0
+        for end, count in enumerate(token_counts):
+            if end > start and (tokens + count > EMBED_BATCH_TOKENS or end - start >= EMBED_BATCH_INPUTS):
+                embeddings.extend(list(e) for e in self.openai_ef(documents[start:end]))
+                start, tokens = end, 0
+            tokens += count
+        embeddings.extend(list(e) for e in self.openai_ef(documents[start:]))
+        return embeddings
+
+    def close(self):
+        """Persists stores that buffer state in memory (the quantized store's memmaps and ANN index)."""
+        if hasattr(self.long_term_history, "flush"):
+            self.long_term_history.flush()
+
     def query_brain(self, user_query: str) -> str:
         """
         Queries both collections and generates a response using GPT-4o.
-        Only considers stream_context from the last 30 minutes (filter not fully implemented in chroma query directly easily, 
-        so we'll retrieve and filter or just retrieve recent).
+        Recency-shaped questions ("what did I just hear") are answered from the in-memory
+        recent_audio ring, ranked by similarity and age; Chroma is used for older audio and
+        whenever nothing in the ring is relevant enough.
         """
         print(f"[Brain] Thinking about: {user_query}")
-        
-        # Retrieve System Context (What the user heard recently)
-        stream_results = self.stream_context.query(
-            query_texts=[user_query],
-            n_results=5
-            # where={"timestamp": {"$gt": time.time() - 1800}} # Optional: Filter time if metadata supported
-        )
+
+        stream_docs = []
+        query_embedding = None
+        if is_recency_query(user_query) and len(self.recent_audio):
+            query_embedding = list(self.openai_ef([user_query])[0])
+            hits = self.recent_audio.search(query_embedding, k=5, min_score=RECENT_AUDIO_MIN_SCORE)
+            stream_docs = [text for text, _, _ in hits]
+            print(f"[Brain] Recent audio: {len(stream_docs)} relevant segments")
+
+        if not stream_docs:
+            # Retrieve System Context (What the user heard recently)
+            if query_embedding is not None:
+                stream_results = self.stream_context.query(
+                    query_embeddings=[query_embedding],
+                    n_results=5
+                )
+            else:
+                stream_results = self.stream_context.query(
+                    query_texts=[user_query],
+                    n_results=5
+                )
+            if stream_results['documents']:
+                stream_docs = stream_results['documents'][0]
         
         # Retrieve Long Term Memory (Browser history, facts)
-        history_results = self.long_term_history.query(
-            query_texts=[user_query],
-            n_results=3
-        )
+        if query_embedding is not None:
+            history_results = self.long_term_history.query(
+                query_embeddings=[query_embedding],
+                n_results=3
+            )
+        else:
+            history_results = self.long_term_history.query(
+                query_texts=[user_query],
+                n_results=3
+            )
         
         # Format Context
         context_str = "--- SYSTEM AUDIO CONTEXT (What the user heard) ---\n"
-        if stream_results['documents']:
-            for doc in stream_results['documents'][0]:
-                context_str += f"- {doc}\n"
+        for doc in stream_docs:
+            context_str += f"- {doc}\n"
         
         context_str += "\n--- LONG TERM HISTORY (Browser/Facts) ---\n"
         if history_results['documents']:
@@ -0,0 +1,53 @@
+"""
+Copies a Chroma collection (by default long_term_history in ./chroma_db) into a
+QuantizedVectorStore, reusing the stored embeddings so nothing is re-embedded.
+
+Usage:
+    python migrate_chroma.py --dtype int8
+    LONG_TERM_STORE=quantized python server.py
+"""
+import argparse
+import time
+
+import chromadb
+
+from vector_store import QuantizedVectorStore
+
+def migrate(chroma_path: str, collection_name: str, out_path: str, dtype: str, index: str, batch_size: int):
+    client = chromadb.PersistentClient(path=chroma_path)
+    collection = client.get_collection(name=collection_name)
+    total = collection.count()
+    print(f"[Migrate] {collection_name}: {total} items from {chroma_path} -> {out_path} ({dtype}, {index})")
+
+    store = QuantizedVectorStore(out_path, dtype=dtype, index=index, auto_train=False)
+    started = time.time()
+    for offset in range(0, total, batch_size):
+        batch = collection.get(
+            limit=batch_size,
+            offset=offset,
+            include=["embeddings", "documents", "metadatas"]
+        )
+        store.add(
+            ids=batch["ids"],
+            documents=batch["documents"],
+            metadatas=[meta or {} for meta in batch["metadatas"]],
+            embeddings=batch["embeddings"]
+        )
+        print(f"[Migrate] {min(offset + batch_size, total)}/{total}")
+
+    if index == "ivf":
+        store.build_index()
+    store.flush()
+    print(f"[Migrate] Done: {store.count()} vectors in {time.time() - started:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate a Chroma collection into a QuantizedVectorStore")
+    parser.add_argument("--chroma", default="./chroma_db")
+    parser.add_argument("--collection", default="long_term_history")
+    parser.add_argument("--out", default="./vector_store/long_term_history")
+    parser.add_argument("--dtype", default="int8", choices=["int8", "float16"])
+    parser.add_argument("--index", default="ivf", choices=["ivf", "hnsw"])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    migrate(args.chroma, args.collection, args.out, args.dtype, args.index, args.batch_size)
@@ -0,0 +1,91 @@
+import re
+import time
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Phrases that mean the user is asking about something they heard a moment ago.
+# Each needs an explicit "just now" cue: "what did she say about the budget" may be about any day.
+RECENCY_PATTERN = re.compile(
+    r"\b("
+    r"just (?:heard|said|played|mentioned|saw)|right now|a (?:moment|minute|second|few minutes) ago|"
+    r"last (?:few |couple (?:of )?)?(?:minutes?|seconds?|thing|sentence)|"
+    r"what (?:did|was) (?:i|he|she|they|that|it) just (?:hear|heard|say|said)|"
+    r"what was that"
+    r")\b",
+    re.IGNORECASE,
+)
+
+def is_recency_query(query: str) -> bool:
+    """Returns True if the query is about the last few minutes of audio."""
+    return bool(RECENCY_PATTERN.search(query or ""))
+
+class RecencyIndex:
+    """
+    In-process ring of the last few minutes of system audio transcripts.
+    Embeddings are normalized on insert and kept in one preallocated matrix,
+    so a search is a single matrix-vector product plus a time decay.
+    """
+
+    def __init__(self, window_seconds: float = 600, capacity: int = 512, half_life_seconds: float = 120):
+        self.window_seconds = window_seconds
+        self.capacity = capacity
+        self.half_life_seconds = half_life_seconds
+
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None # Allocated on first add, once the dimension is known
+        self._timestamps = np.full(capacity, -np.inf, dtype=np.float64)
+        self._texts: List[Optional[str]] = [None] * capacity
+        self._next = 0
+
+    def add(self, text: str, embedding: Sequence[float], timestamp: Optional[float] = None):
+        """Stores a transcript, overwriting the oldest slot once the ring is full."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return
+        vector = vector / norm
+
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+            slot = self._next
+            self._vectors[slot] = vector
+            self._timestamps[slot] = timestamp if timestamp is not None else time.time()
+            self._texts[slot] = text
+            self._next = (slot + 1) % self.capacity
+
+    def search(self, query_embedding: Sequence[float], k: int = 5, now: Optional[float] = None,
+               min_score: float = float("-inf")) -> List[Tuple[str, float, float]]:
+        """
+        Returns up to k (text, timestamp, score) tuples from inside the window, best first.
+        Score is cosine similarity halved every half_life_seconds of age; hits below
+        min_score are left out.
+        """
+        now = now if now is not None else time.time()
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query = query / norm
+
+        with self._lock:
+            if self._vectors is None:
+                return []
+            slots = np.flatnonzero(self._timestamps >= now - self.window_seconds)
+            if slots.size == 0:
+                return []
+            ages = np.maximum(now - self._timestamps[slots], 0.0)
+            similarities = self._vectors[slots] @ query
+            texts = [self._texts[i] for i in slots]
+
+        scores = similarities * np.power(0.5, ages / self.half_life_seconds)
+        k = min(k, scores.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(texts[i], float(now - ages[i]), float(scores[i])) for i in top if scores[i] >= min_score]
+
+    def __len__(self):
+        with self._lock:
+            return int(np.count_nonzero(self._timestamps >= time.time() - self.window_seconds))
@@ -1,7 +1,11 @@
 import os
 import time
 import queue
+import asyncio
 import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import anyio.to_thread
 import numpy as np
 import pyaudio
 import webrtcvad_wheels as webrtcvad
@@ -12,6 +16,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uvicorn
 import json
+from typing import List
 
 # Memory Manager
 from memory_manager import MemoryManager
@@ -41,6 +46,18 @@ running = True
 memory_manager = None # Initialized in startup
 toolbox = None # Initialized in startup
 
+# Executors for blocking work called from async handlers (embedding calls, Chroma writes).
+# Sized explicitly so a burst of ingests can't starve the audio threads or each other.
+BLOCKING_WORKERS = int(os.environ.get("SUPERBOT_BLOCKING_WORKERS", "8"))
+# Thread limit for plain `def` endpoints, which Starlette runs in anyio's pool (default 40)
+SYNC_ENDPOINT_WORKERS = int(os.environ.get("SUPERBOT_SYNC_ENDPOINT_WORKERS", "16"))
+blocking_executor = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking")
+
+async def run_blocking(func, *args, **kwargs):
+    """Runs a blocking call on blocking_executor so the event loop keeps serving requests."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, functools.partial(func, *args, **kwargs))
+
 # --- Data Models ---
 class BrowserData(BaseModel):
     url: str
@@ -50,6 +67,21 @@ class BrowserData(BaseModel):
 class ExternalCommand(BaseModel):
     command: str
 
+# Per-turn cap for /ingest-batch, bounding what one chat turn stores; add_memories
+# separately trims each input to the embedding model's token limit
+MAX_CHAT_TURN_CHARS = 8000
+
+class ChatTurn(BaseModel):
+    id: str
+    text: str
+    host: str
+    direction: str # "out": typed by the user, "in": read from the AI
+    conversation: str = ""
+    timestamp: float
+
+class ChatTurnBatch(BaseModel):
+    items: List[ChatTurn]
+
 # --- Audio Threads ---
 
 def user_voice_thread():
@@ -204,6 +236,18 @@ def startup_event():
     t2.start()
     t3.start()
 
+@app.on_event("startup")
+async def configure_executors():
+    anyio.to_thread.current_default_thread_limiter().total_tokens = SYNC_ENDPOINT_WORKERS
+
+@app.on_event("shutdown")
+def shutdown_event():
+    global running
+    running = False
+    blocking_executor.shutdown(wait=False)
+    if memory_manager:
+        memory_manager.close()
+
 @app.get("/")
 def read_root():
     return {"status": "Super-Bot Backend Running"}
@@ -219,13 +263,45 @@ async def ingest_browser(data: BrowserData, background_tasks: BackgroundTasks):
     """
     global memory_manager
     if memory_manager:
-        memory_manager.add_memory(
+        await run_blocking(
+            memory_manager.add_memory,
             text=f"User visited {data.title} ({data.url}). Content: {data.content[:500]}...",
             source="browser",
             metadata={"url": data.url, "title": data.title}
         )
     return {"status": "ingested"}
 
+@app.post("/ingest-batch")
+async def ingest_batch(batch: ChatTurnBatch):
+    """
+    Bulk endpoint for test-mitm/memory_bridge.py: AI chat turns captured by the proxy.
+    Turn ids are content hashes, so re-sent batches don't create duplicates.
+    """
+    global memory_manager
+    if memory_manager:
+        try:
+            await run_blocking(memory_manager.add_memories, [
+                {
+                    "id": f"ai_chat_{turn.id}",
+                    "text": f"{'User asked' if turn.direction == 'out' else 'AI replied'} on {turn.host}: {turn.text[:MAX_CHAT_TURN_CHARS]}",
+                    "source": "ai_chat",
+                    "metadata": {
+                        "host": turn.host,
+                        "direction": turn.direction,
+                        "conversation": turn.conversation,
+                        "timestamp": turn.timestamp
+                    }
+                }
+                for turn in batch.items
+            ])
+        except Exception as e:
+            # A 400 from the embedding API means this input will never be accepted; a 4xx tells
+            # the bridge to set the batch aside instead of retrying it ahead of newer ones
+            if getattr(e, "status_code", None) == 400:
+                raise HTTPException(status_code=422, detail=f"Embedding rejected batch: {e}")
+            raise
+    return {"status": "ingested", "count": len(batch.items)}
+
 @app.post("/api/external-command")
 async def external_command(cmd: ExternalCommand, x_api_key: str = Header(None)):
     """
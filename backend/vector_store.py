@@ -0,0 +1,398 @@
+import os
+import json
+import sqlite3
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Optional HNSW backend. Falls back to the built-in IVF index if not installed.
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+SUPPORTED_DTYPES = {"float16": np.float16, "int8": np.int8}
+
+IVF_TRAIN_MIN = 10000 # Below this a flat scan over the memmap is fast enough
+IVF_RETRAIN_FACTOR = 8 # Retrain once the store has grown this much since the last training
+MIN_CAPACITY = 1024
+TRAIN_READ_ROWS = 8192 # Rows build_index() reads per lock acquisition
+
+class QuantizedVectorStore:
+    """
+    Disk-backed vector collection with a Chroma-like add()/query() interface.
+
+    Vectors are L2-normalized and stored as float16 or int8 (per-row scale) in a
+    memory-mapped file, documents and metadata live in SQLite. Queries first pick
+    a small candidate set from an ANN index (IVF by default, HNSW if hnswlib is
+    installed and requested), then re-rank the candidates exactly in float32.
+
+    Only IVF mode is quantized end to end. hnswlib keeps its own float32 copy of
+    every vector, in RAM and in hnsw.bin, so HNSW mode costs more memory than a
+    plain float32 store; it trades that for lower query latency.
+    """
+
+    def __init__(self, path: str, embedding_function: Optional[Callable] = None,
+                 dtype: str = "int8", index: str = "ivf", nprobe: int = 16, rerank_factor: int = 8,
+                 auto_train: bool = True):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported dtype '{dtype}', expected one of {list(SUPPORTED_DTYPES)}")
+        if index == "hnsw" and hnswlib is None:
+            print("[VectorStore] hnswlib not installed, falling back to IVF index")
+            index = "ivf"
+
+        self.path = path
+        self.embedding_function = embedding_function
+        self.nprobe = nprobe
+        self.rerank_factor = rerank_factor
+        self.auto_train = auto_train # Retrain IVF in the background as the store grows; bulk loaders call build_index() instead
+        self.hnsw_ef = 64
+        self._lock = threading.RLock()
+        self._training = None # Background IVF retraining thread, if one is running
+
+        os.makedirs(path, exist_ok=True)
+        self._meta_path = os.path.join(path, "meta.json")
+        self.meta = {"dim": None, "dtype": dtype, "index": index, "count": 0, "capacity": 0, "trained_count": 0}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                self.meta.update(json.load(f))
+
+        self.db = sqlite3.connect(os.path.join(path, "docs.sqlite"), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS items (row INTEGER PRIMARY KEY, id TEXT UNIQUE, document TEXT, metadata TEXT)"
+        )
+        self.db.commit()
+
+        # After a crash, only rows present both in meta.json and SQLite are complete:
+        # drop SQLite rows past the saved count so their row numbers can be reused.
+        max_row = self.db.execute("SELECT MAX(row) FROM items").fetchone()[0]
+        self.meta["count"] = min(self.meta["count"], (max_row + 1) if max_row is not None else 0)
+        self.db.execute("DELETE FROM items WHERE row >= ?", (self.meta["count"],))
+        self.db.commit()
+
+        self._vectors = None
+        self._scales = None
+        self._assign = None
+        self._centroids = None
+        self._lists: List[np.ndarray] = []
+        self._hnsw = None
+        if self.meta["dim"]:
+            self._open_arrays()
+            self._load_index()
+
+    # --- Storage ---
+
+    @property
+    def dtype(self):
+        return SUPPORTED_DTYPES[self.meta["dtype"]]
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _open_arrays(self):
+        capacity, dim = self.meta["capacity"], self.meta["dim"]
+        self._vectors = np.memmap(self._file("vectors.bin"), dtype=self.dtype, mode="r+", shape=(capacity, dim))
+        self._scales = np.memmap(self._file("scales.bin"), dtype=np.float32, mode="r+", shape=(capacity,))
+        self._assign = np.memmap(self._file("ivf_assign.bin"), dtype=np.int32, mode="r+", shape=(capacity,))
+
+    def _ensure_capacity(self, needed: int):
+        if needed <= self.meta["capacity"]:
+            return
+        capacity = max(MIN_CAPACITY, self.meta["capacity"])
+        while capacity < needed:
+            capacity *= 2
+
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._scales.flush()
+            self._assign.flush()
+            self._vectors = self._scales = self._assign = None
+
+        dim = self.meta["dim"]
+        for name, row_bytes in (("vectors.bin", dim * np.dtype(self.dtype).itemsize), ("scales.bin", 4), ("ivf_assign.bin", 4)):
+            with open(self._file(name), "ab") as f:
+                f.truncate(capacity * row_bytes)
+
+        old_capacity = self.meta["capacity"]
+        self.meta["capacity"] = capacity
+        self._open_arrays()
+        self._assign[old_capacity:] = -1
+
+        if self._hnsw is not None:
+            self._hnsw.resize_index(capacity)
+
+    def _quantize(self, vectors: np.ndarray):
+        if self.meta["dtype"] == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            codes = np.round(vectors / scales[:, None]).astype(np.int8)
+            return codes, scales.astype(np.float32)
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+
+    def _dequantize(self, rows: np.ndarray) -> np.ndarray:
+        return self._vectors[rows].astype(np.float32) * self._scales[rows][:, None]
+
+    def _save_meta(self):
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, self._meta_path)
+
+    # --- Chroma-compatible API ---
+
+    def count(self) -> int:
+        return self.meta["count"]
+
+    def add(self, ids: List[str], documents: List[str], metadatas: Optional[List[Dict]] = None,
+            embeddings: Optional[Sequence[Sequence[float]]] = None):
+        if not ids:
+            return
+        metadatas = metadatas or [{} for _ in ids]
+
+        with self._lock:
+            # Like Chroma, silently skip IDs that already exist; within the batch the first one wins
+            placeholders = ",".join("?" * len(ids))
+            existing = {row[0] for row in self.db.execute(f"SELECT id FROM items WHERE id IN ({placeholders})", ids)}
+            keep = []
+            for i, item_id in enumerate(ids):
+                if item_id not in existing:
+                    existing.add(item_id)
+                    keep.append(i)
+            if not keep:
+                return
+
+            if embeddings is None:
+                embeddings = self.embedding_function([documents[i] for i in keep])
+                vectors = np.asarray(embeddings, dtype=np.float32)
+            else:
+                vectors = np.asarray(embeddings, dtype=np.float32)[keep]
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1.0, norms)
+
+            if self.meta["dim"] is None:
+                self.meta["dim"] = int(vectors.shape[1])
+            start = self.meta["count"]
+            end = start + len(keep)
+            self._ensure_capacity(end)
+
+            rows = np.arange(start, end)
+            try:
+                # Rows past count are free until meta.json moves on, so a failure here leaves nothing behind
+                self.db.executemany(
+                    "INSERT INTO items (row, id, document, metadata) VALUES (?, ?, ?, ?)",
+                    [(int(row), ids[i], documents[i], json.dumps(metadatas[i])) for row, i in zip(rows, keep)]
+                )
+                codes, scales = self._quantize(vectors)
+                self._vectors[start:end] = codes
+                self._scales[start:end] = scales
+                self._index_rows(rows, vectors)
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+            self.meta["count"] = end
+            self._save_meta()
+
+            if self.meta["index"] == "ivf" and self.auto_train:
+                trained = self.meta["trained_count"]
+                if (not trained and end >= IVF_TRAIN_MIN) or (trained and end >= trained * IVF_RETRAIN_FACTOR):
+                    self._start_training()
+
+    def query(self, query_texts: Optional[List[str]] = None, query_embeddings: Optional[Sequence[Sequence[float]]] = None,
+              n_results: int = 10) -> Dict[str, List[List]]:
+        if query_embeddings is None:
+            query_embeddings = self.embedding_function(query_texts)
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for query in queries:
+            norm = np.linalg.norm(query)
+            query = query / norm if norm else query
+            with self._lock:
+                rows, scores = self._search(query, n_results)
+                items = self._fetch(rows)
+            results["ids"].append([items[r][0] for r in rows])
+            results["documents"].append([items[r][1] for r in rows])
+            results["metadatas"].append([items[r][2] for r in rows])
+            results["distances"].append([float(1.0 - s) for s in scores])
+        return results
+
+    def flush(self):
+        """Writes memmaps and the ANN index to disk."""
+        with self._lock:
+            if self._vectors is None:
+                return
+            self._vectors.flush()
+            self._scales.flush()
+            self._assign.flush()
+            if self._hnsw is not None:
+                self._hnsw.save_index(self._file("hnsw.bin"))
+            self._save_meta()
+
+    # --- Search ---
+
+    def _search(self, query: np.ndarray, k: int):
+        count = self.meta["count"]
+        if count == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        candidates = self._candidates(query, max(k * self.rerank_factor, 64))
+        # Exact re-rank of the small candidate set
+        scores = self._dequantize(candidates) @ query
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return candidates[top], scores[top]
+
+    def _candidates(self, query: np.ndarray, n: int) -> np.ndarray:
+        count = self.meta["count"]
+        if count <= n:
+            return np.arange(count)
+
+        if self._hnsw is not None:
+            self._hnsw.set_ef(max(self.hnsw_ef, n))
+            labels, _ = self._hnsw.knn_query(query, k=n)
+            return labels[0].astype(np.int64)
+
+        if self._centroids is not None:
+            order = np.argsort(-(self._centroids @ query))
+            # Probe at least nprobe lists, and more if they hold fewer than n rows
+            sizes = np.cumsum([len(self._lists[c]) for c in order])
+            probes = order[:max(self.nprobe, int(np.searchsorted(sizes, n)) + 1)]
+            rows = np.concatenate([self._lists[c] for c in probes])
+            # Rows added after the last training pass carry their own assignment
+            untrained = np.arange(self.meta["trained_count"], count)
+            if untrained.size:
+                rows = np.concatenate([rows, untrained[np.isin(self._assign[untrained], probes)]])
+            return rows
+
+        # Flat scan in chunks, used before the IVF index has been trained
+        best_rows, best_scores = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        for start in range(0, count, 65536):
+            rows = np.arange(start, min(start + 65536, count))
+            scores = np.concatenate([best_scores, self._dequantize(rows) @ query])
+            rows = np.concatenate([best_rows, rows])
+            keep = np.argpartition(-scores, min(n, len(scores)) - 1)[:n]
+            best_rows, best_scores = rows[keep], scores[keep]
+        return best_rows
+
+    def _fetch(self, rows: np.ndarray) -> Dict[int, tuple]:
+        if len(rows) == 0:
+            return {}
+        placeholders = ",".join("?" * len(rows))
+        cursor = self.db.execute(
+            f"SELECT row, id, document, metadata FROM items WHERE row IN ({placeholders})", [int(r) for r in rows]
+        )
+        return {row: (item_id, doc, json.loads(meta)) for row, item_id, doc, meta in cursor}
+
+    # --- Index maintenance ---
+
+    def _index_rows(self, rows: np.ndarray, vectors: np.ndarray):
+        if self.meta["index"] == "hnsw":
+            if self._hnsw is None:
+                self._init_hnsw()
+            self._hnsw.add_items(vectors, rows)
+        elif self._centroids is not None:
+            self._assign[rows] = np.argmax(vectors @ self._centroids.T, axis=1)
+
+    def _init_hnsw(self):
+        self._hnsw = hnswlib.Index(space="ip", dim=self.meta["dim"])
+        self._hnsw.init_index(max_elements=self.meta["capacity"], ef_construction=200, M=16)
+
+    def _load_index(self):
+        count = self.meta["count"]
+        if self.meta["index"] == "hnsw":
+            hnsw_path = self._file("hnsw.bin")
+            if os.path.exists(hnsw_path):
+                self._hnsw = hnswlib.Index(space="ip", dim=self.meta["dim"])
+                self._hnsw.load_index(hnsw_path, max_elements=self.meta["capacity"])
+            else:
+                self._init_hnsw()
+            # Catch up on rows added after the index was last saved
+            indexed = self._hnsw.get_current_count()
+            for start in range(indexed, count, 65536):
+                rows = np.arange(start, min(start + 65536, count))
+                self._hnsw.add_items(self._dequantize(rows), rows)
+            return
+
+        centroids_path = self._file("ivf_centroids.npy")
+        if os.path.exists(centroids_path) and self.meta["trained_count"]:
+            self._centroids = np.load(centroids_path)
+            self._build_lists()
+
+    def _build_lists(self):
+        trained = self.meta["trained_count"]
+        assign = np.asarray(self._assign[:trained])
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(len(self._centroids) + 1))
+        self._lists = [order[bounds[c]:bounds[c + 1]] for c in range(len(self._centroids))]
+
+    def _start_training(self):
+        # k-means over a large store takes seconds; keep it off the add() path
+        if self._training is not None and self._training.is_alive():
+            return
+        self._training = threading.Thread(target=self.build_index, name="ivf-training", daemon=True)
+        self._training.start()
+
+    def build_index(self, nlist: Optional[int] = None, iterations: int = 10):
+        """
+        (Re)trains the IVF coarse quantizer on the current rows and assigns every row to a list.
+        Training runs without holding the store lock, so adds and queries continue meanwhile.
+        """
+        with self._lock:
+            count = self.meta["count"]
+            if self.meta["index"] != "ivf" or count == 0:
+                return
+
+        def dequantize(rows):
+            # Short lock holds through the current memmaps: add() may grow (and remap) the
+            # files meanwhile, and Windows can't resize a file while a view of it is held
+            parts = []
+            for start in range(0, len(rows), TRAIN_READ_ROWS):
+                with self._lock:
+                    parts.append(self._dequantize(rows[start:start + TRAIN_READ_ROWS]))
+            return np.concatenate(parts)
+
+        nlist = nlist or int(np.clip(4 * np.sqrt(count), 16, 4096))
+        nlist = min(nlist, count)
+        print(f"[VectorStore] Training IVF index: {count} vectors, {nlist} lists")
+
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(count, min(count, nlist * 64, 200000), replace=False))
+        centroids = _spherical_kmeans(dequantize(sample_rows), nlist, iterations, rng)
+        assign = np.empty(count, dtype=np.int32)
+        for start in range(0, count, 65536):
+            rows = np.arange(start, min(start + 65536, count))
+            assign[rows] = np.argmax(dequantize(rows) @ centroids.T, axis=1)
+
+        with self._lock:
+            self._centroids = centroids
+            self._assign[:count] = assign
+            # Rows added while training was running
+            for start in range(count, self.meta["count"], 65536):
+                rows = np.arange(start, min(start + 65536, self.meta["count"]))
+                self._assign[rows] = np.argmax(self._dequantize(rows) @ centroids.T, axis=1)
+
+            np.save(self._file("ivf_centroids.npy"), centroids)
+            self.meta["trained_count"] = count
+            self._build_lists()
+            self.flush()
+
+def _spherical_kmeans(data: np.ndarray, nlist: int, iterations: int, rng) -> np.ndarray:
+    centroids = data[rng.choice(len(data), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(data @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        sorted_assign = assign[order]
+        starts = np.searchsorted(sorted_assign, np.arange(nlist))
+        present = np.unique(sorted_assign)
+        sums = np.add.reduceat(data[order], starts[present], axis=0)
+        centroids[present] = sums
+        # Re-seed empty lists from random points
+        empty = np.setdiff1d(np.arange(nlist), present)
+        if empty.size:
+            centroids[empty] = data[rng.choice(len(data), empty.size, replace=False)]
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    return centroids.astype(np.float32)
@@ -0,0 +1,106 @@
+"""
+Query latency benchmark for the traffic store on a synthetic multi-million-record log.
+
+Usage:
+    python bench_traffic_store.py --records 2000000
+    python bench_traffic_store.py --db existing.db --skip-load
+"""
+import os
+import time
+import random
+import argparse
+import statistics
+from traffic_store import connect, insert_records, search_traffic
+
+HOSTS = ["chatgpt.com", "claude.ai", "www.google.com", "api.github.com", "cdn.example.com"] + \
+        [f"tracker{i}.ads.net" for i in range(200)]
+TYPES = ["HTTP_REQ", "HTTP_RES", "WS_OUT", "WS_IN"]
+STATUSES = [200, 200, 200, 204, 301, 404, 500]
+WORDS = [f"w{i}" for i in range(20000)] # Zipf-ish vocabulary: low numbers are common, high ones rare
+
+def synthetic_record(rng, ts):
+    kind = rng.choice(TYPES)
+    host = HOSTS[min(int(rng.paretovariate(1.2)) - 1, len(HOSTS) - 1)]
+    words = " ".join(WORDS[min(int(rng.paretovariate(0.8)) - 1, len(WORDS) - 1)] for _ in range(rng.randint(5, 60)))
+    return {
+        "ts": ts,
+        "type": kind,
+        "method": "POST" if kind == "HTTP_REQ" else None,
+        "status": rng.choice(STATUSES) if kind == "HTTP_RES" else None,
+        "url": f"https://{host}/api/v1/item/{rng.randint(1, 10**6)}",
+        "content_type": "application/json",
+        "body": '{"text":"' + words + '"}',
+    }
+
+def load(db, records, batch_size=20000):
+    rng = random.Random(7)
+    start_ts = time.time() - records
+    started = time.perf_counter()
+    for offset in range(0, records, batch_size):
+        batch = [synthetic_record(rng, start_ts + offset + i) for i in range(min(batch_size, records - offset))]
+        insert_records(db, batch)
+        if (offset // batch_size) % 10 == 0:
+            print(f"  {offset + len(batch)}/{records}")
+    elapsed = time.perf_counter() - started
+    print(f"Loaded {records} records in {elapsed:.1f}s ({records / elapsed:.0f} records/s)")
+
+def timed(db, repeat, **kwargs):
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = search_traffic(db, **kwargs)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1], len(result["items"]), result["next_cursor"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Traffic store query latency benchmark")
+    parser.add_argument("--records", type=int, default=2000000)
+    parser.add_argument("--db", default="bench_traffic_index.db")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    if not args.skip_load:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+        db = connect(args.db)
+        load(db, args.records)
+        db.close()
+    else:
+        connect(args.db).close() # Applies schema upgrades before the read-only connection
+
+    db = connect(args.db, readonly=True)
+    total = db.execute("SELECT COUNT(*) FROM traffic").fetchone()[0]
+    ts_min, ts_max = db.execute("SELECT MIN(ts), MAX(ts) FROM traffic").fetchone()
+    deep_cursor = db.execute("SELECT id FROM traffic ORDER BY id LIMIT 1 OFFSET ?", (total // 2,)).fetchone()[0]
+    print(f"\n{total} records, {os.path.getsize(args.db) / 2**20:.0f} MiB\n")
+
+    cases = [
+        ("latest page", {}),
+        ("host (common)", {"host": "chatgpt.com"}),
+        ("host (rare)", {"host": "tracker150.ads.net"}),
+        ("type + status", {"type": "HTTP_RES", "status": 500}),
+        ("time window (1h)", {"since": ts_max - 3600, "until": ts_max}),
+        ("time window (old)", {"since": ts_min, "until": ts_min + 3600}),
+        ("time window (all)", {"since": ts_min}),
+        ("since (wide)", {"since": ts_min + (ts_max - ts_min) / 10}),
+        ("text (common)", {"q": "w0"}),
+        ("text (rare)", {"q": "w19000"}),
+        ("text (two words)", {"q": "w1 w50"}),
+        ("text + host", {"q": "w3", "host": "claude.ai"}),
+        ("text + rare host", {"q": "w0", "host": "tracker150.ads.net"}),
+        ("rare text + host", {"q": "w19000", "host": "chatgpt.com"}),
+        ("text + wide window", {"q": "w0", "since": ts_min}),
+        ("deep page (cursor)", {"cursor": deep_cursor}),
+        ("text deep page", {"q": "w0", "cursor": deep_cursor}),
+    ]
+    print(f"{'query':<22} {'p50 ms':>8} {'p95 ms':>8} {'rows':>6}")
+    for name, kwargs in cases:
+        p50, p95, rows, _ = timed(db, args.repeat, limit=50, **kwargs)
+        print(f"{name:<22} {p50:>8.2f} {p95:>8.2f} {rows:>6}")
+    db.close()
+
+if __name__ == "__main__":
+    main()
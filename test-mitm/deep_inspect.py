@@ -1,6 +1,8 @@
 from mitmproxy import http, websocket
 import json
+import asyncio
 import logging
+from stream_extract import StreamExtractor
 
 # Set mitmproxy's own logging to ERROR only to keep the console clean
 # logging.getLogger("mitmproxy").setLevel(logging.ERROR)
@@ -17,25 +19,23 @@ TARGETS = ["chatgpt.com", "openai.com", "claude.ai", "google.com", "example.com"
 def is_target(flow):
     return any(t in flow.request.pretty_host for t in TARGETS)
 
-def extract_text(data):
-    """Recursively search for text-like content in a JSON object."""
-    if isinstance(data, str):
-        if len(data) > 2 and not data.startswith("{"):
-            return data
-    elif isinstance(data, dict):
-        for k, v in data.items():
-            # Common fields in AI chat APIs
-            if k in ["content", "parts", "text", "body", "input", "query", "prompt", "message"]:
-                res = extract_text(v)
-                if res: return res
-            else:
-                res = extract_text(v)
-                if res: return res
-    elif isinstance(data, list):
-        for item in data:
-            res = extract_text(item)
-            if res: return res
-    return None
+def print_message(host, key, direction, text):
+    """Called by the extractor once a streamed message has been fully reassembled."""
+    arrow = ">> ASSEMBLED OUTGOING" if direction == "out" else "<< ASSEMBLED INCOMING"
+    print(f"\n[{arrow}] {host}")
+    print(f"Message: {text[:1000]}")
+
+# Parses SSE/websocket streams incrementally and learns per-host JSON paths
+extractor = StreamExtractor(on_message=print_message)
+sweeper = None
+
+def is_event_stream(headers):
+    return "text/event-stream" in headers.get("Content-Type", "")
+
+def running():
+    # Completes messages on websockets that go quiet without closing
+    global sweeper
+    sweeper = asyncio.get_running_loop().create_task(extractor.run_sweeper())
 
 def request(flow: http.HTTPFlow):
     # DEBUG: Show everything briefly to confirm the proxy is receiving data
@@ -54,7 +54,7 @@ def request(flow: http.HTTPFlow):
                     return
 
                 print(f"\n[>> OUTGOING HTTP POST] {flow.request.pretty_url}")
-                found_text = extract_text(data)
+                found_text = extractor.extract(flow.request.pretty_host, data)
                 if found_text:
                     print(f"Found Content: {found_text[:1000]}")
                 else:
@@ -62,10 +62,22 @@ def request(flow: http.HTTPFlow):
             except:
                 pass
 
+def responseheaders(flow: http.HTTPFlow):
+    if not is_target(flow) or not is_event_stream(flow.response.headers):
+        return
+
+    # Stream the body through the extractor chunk by chunk instead of buffering it
+    print(f"\n[<< INCOMING STREAM] {flow.request.pretty_url}")
+    flow.response.stream = extractor.stream_handler(flow)
+
 def response(flow: http.HTTPFlow):
     if not is_target(flow):
         return
-        
+
+    if is_event_stream(flow.response.headers):
+        extractor.end_stream(flow.id)
+        return
+
     content_type = flow.response.headers.get("Content-Type", "")
     if "application/json" in content_type:
         try:
@@ -74,7 +86,7 @@ def response(flow: http.HTTPFlow):
                 return
 
             print(f"\n[<< INCOMING HTTP RESPONSE] {flow.request.pretty_url}")
-            found_text = extract_text(data)
+            found_text = extractor.extract(flow.request.pretty_host, data)
             if found_text:
                 print(f"Found Content: {found_text[:1000]}")
             else:
@@ -95,23 +107,33 @@ def websocket_message(flow: http.HTTPFlow):
         if isinstance(content, bytes):
             content = content.decode('utf-8')
         
-        json_data = json.loads(content)
+        json_data = extractor.parse(content)
+        if json_data is None:
+            raise ValueError("not JSON")
         
         # Filter out noisy presence updates
         if isinstance(json_data, dict) and json_data.get("type") in ["presence", "heartbeat"]:
             return
 
-        print(f"\n[{direction}] {flow.request.pretty_host}")
-        
-        # Deep extract for ChatGPT's complex WS envelopes
-        text = extract_text(json_data)
-        if text:
-            print(f"Message: {text}")
-        else:
-            print(f"JSON Structure: {json.dumps(json_data, indent=2)[:500]}...")
+        # Frames are usually deltas; the extractor prints the whole message once it is complete
+        text = extractor.feed_json(flow.id, flow.request.pretty_host, json_data, "out" if message.from_client else "in")
+        if text is None:
+            print(f"\n[{direction}] {flow.request.pretty_host}")
+            print(f"JSON Structure: {str(json_data)[:500]}...")
             
     except:
         # If not JSON, print if it looks like meaningful text
         if len(content) > 5:
             print(f"\n[{direction}] {flow.request.pretty_host}")
-            print(f"Raw: {content}")
+            print(f"Raw: {content[:1000]}")
+
+def websocket_end(flow: http.HTTPFlow):
+    extractor.end_stream(flow.id)
+
+def error(flow: http.HTTPFlow):
+    # Aborted flows never reach response()/websocket_end()
+    extractor.end_stream(flow.id)
+
+def done():
+    if sweeper is not None:
+        sweeper.cancel()
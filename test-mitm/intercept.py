@@ -1,5 +1,6 @@
 from mitmproxy import http
 import os
+from log_writer import BufferedLogWriter
 
 # Configuration
 LOG_FILE = "traffic_log.txt"
@@ -12,6 +13,8 @@ BLOCK_DOMAINS = [
     "adservice"
 ]
 
+log_writer = BufferedLogWriter(LOG_FILE)
+
 def response(flow: http.HTTPFlow) -> None:
     url = flow.request.pretty_url
     
@@ -29,9 +32,10 @@ def response(flow: http.HTTPFlow) -> None:
     # Append the URL and the first 500 characters of the response content to a local file
     content_snippet = flow.response.get_text()[:500] if flow.response.content else "[No Content]"
     
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(f"--- INTERCEPTED: {url} ---\n")
-        f.write(f"{content_snippet}\n\n")
+    log_writer.write(f"--- INTERCEPTED: {url} ---\n{content_snippet}\n")
 
     # Print a distinct message to the console
     print(f"[INTERCEPTED]: {url}")
+
+def done():
+    log_writer.close()
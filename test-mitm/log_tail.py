@@ -0,0 +1,202 @@
+import os
+import sys
+import asyncio
+import ctypes
+import ctypes.util
+
+# inotify flags (see <sys/inotify.h>)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+READ_BLOCK = 64 * 1024
+
+def _inotify_watch(directory):
+    """Returns an inotify fd watching directory, or None where inotify isn't available."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+class LogTailer:
+    """
+    Single reader for a growing JSONL log, shared by every SSE client.
+
+    New lines are fanned out to subscriber queues. A slow subscriber only loses its
+    own oldest lines, it never holds up the reader or other clients. The reader wakes
+    on inotify where available and falls back to polling. Rotation by the log writer
+    (file renamed away, new file created) is followed automatically.
+    """
+
+    def __init__(self, path, queue_size=1000, poll_interval=0.1):
+        self.path = path
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.subscribers = set()
+        self._task = None
+        self._wakeup = None
+        self._inotify_fd = None
+
+    def subscribe(self):
+        q = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        self.subscribers.discard(q)
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._inotify_fd = _inotify_watch(os.path.dirname(os.path.abspath(self.path)))
+        if self._inotify_fd is not None:
+            loop.add_reader(self._inotify_fd, self._on_inotify)
+        self._task = loop.create_task(self._run())
+
+    async def stop(self):
+        if self._inotify_fd is not None:
+            asyncio.get_running_loop().remove_reader(self._inotify_fd)
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def _on_inotify(self):
+        try:
+            while os.read(self._inotify_fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        self._wakeup.set()
+
+    def _publish(self, line):
+        for q in self.subscribers:
+            if q.full():
+                q.get_nowait() # Drop this subscriber's oldest line
+            q.put_nowait(line)
+
+    async def _wait(self):
+        # With inotify the timeout is only a safety net
+        timeout = 1.0 if self._inotify_fd is not None else self.poll_interval
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _run(self):
+        f = None
+        partial = b""
+        discard_partial = False
+        skip_existing = True
+        try:
+            while True:
+                if f is None:
+                    try:
+                        f = open(self.path, "rb")
+                        partial = b""
+                        discard_partial = False
+                        if skip_existing:
+                            end = f.seek(0, os.SEEK_END) # Stream only NEW logs
+                            if end > 0:
+                                # Started mid-line: its head is already gone, drop the tail
+                                f.seek(end - 1)
+                                discard_partial = f.read(1) != b"\n"
+                    except FileNotFoundError:
+                        skip_existing = False # Anything in the file once it appears is new
+                        await self._wait()
+                        continue
+
+                chunk = f.read(READ_BLOCK)
+                if chunk:
+                    lines = (partial + chunk).split(b"\n")
+                    partial = lines.pop()
+                    if discard_partial and lines:
+                        lines.pop(0)
+                        discard_partial = False
+                    for line in lines:
+                        if line.strip():
+                            self._publish(line.decode("utf-8", errors="replace"))
+                    continue
+
+                if self._rotated(f):
+                    f.close()
+                    f = open(self.path, "rb") # Read the new segment from the start
+                    partial = b""
+                    discard_partial = False
+                    continue
+                await self._wait()
+        finally:
+            if f:
+                f.close()
+
+    def _rotated(self, f):
+        try:
+            current = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return current.st_ino != os.fstat(f.fileno()).st_ino or current.st_size < f.tell()
+
+def read_lines_before(path, limit, before=None):
+    """
+    Returns up to `limit` (offset, line) pairs ending just before byte offset `before`
+    (default: end of file), oldest first. Reads backward in blocks, so the cost depends
+    on `limit`, not on the size of the file. A trailing line still being written is skipped.
+    """
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        pos = size if before is None else min(before, size)
+        buffer = b""
+        while pos > 0 and buffer.count(b"\n") <= limit:
+            start = max(0, pos - READ_BLOCK)
+            f.seek(start)
+            buffer = f.read(pos - start) + buffer
+            pos = start
+
+    # The last piece is empty, or a line still being written; the first piece
+    # is a partial line unless we reached the start of the file.
+    lines = buffer.split(b"\n")[:-1]
+    pairs = []
+    offset = pos
+    for line in lines:
+        pairs.append((offset, line))
+        offset += len(line) + 1
+    if pos > 0:
+        pairs = pairs[1:]
+    return [(o, l.decode("utf-8", errors="replace")) for o, l in pairs[-limit:] if l.strip()]
+
+def read_lines_after(path, limit, after):
+    """Returns up to `limit` (offset, line) pairs starting at the first line at or after byte offset `after`."""
+    results = []
+    with open(path, "rb") as f:
+        if after > 0:
+            f.seek(after - 1)
+            if f.read(1) != b"\n":
+                f.readline() # `after` is mid-line, skip to the next line start
+        else:
+            f.seek(0)
+        while len(results) < limit:
+            offset = f.tell()
+            line = f.readline()
+            if not line.endswith(b"\n"):
+                break # EOF or a line still being written
+            if line.strip():
+                results.append((offset, line.decode("utf-8", errors="replace").rstrip("\n")))
+    return results
@@ -0,0 +1,181 @@
+import os
+import gzip
+import time
+import queue
+import shutil
+import atexit
+import threading
+from datetime import datetime
+
+DROP_REPORT_SECONDS = 10.0 # At most one "dropped N items" message per worker this often
+
+class BatchWorker:
+    """
+    Queue drained by a daemon thread in batches, so addon hooks never wait on I/O.
+    Subclasses implement process_batch() and may override on_idle() and on_close(),
+    all of which run on the worker thread.
+    """
+
+    def __init__(self, name, flush_interval=0.5, batch_size=1000, max_queue=100000):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._reported_at = 0.0
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def put(self, item):
+        """Queues one item. Never blocks; drops the item if the worker has fallen far behind."""
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Processes everything still queued, then stops the worker."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._thread.join(timeout=10)
+
+    def process_batch(self, batch):
+        raise NotImplementedError
+
+    def on_idle(self):
+        pass
+
+    def on_close(self):
+        pass
+
+    def _run(self):
+        while not (self._closed.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                try:
+                    self.on_idle()
+                except Exception as e:
+                    print(f"[{self._thread.name}] Error in idle hook: {e}")
+                self._report_dropped()
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.process_batch(batch)
+            except Exception as e:
+                print(f"[{self._thread.name}] Error processing batch: {e}")
+            self._report_dropped()
+        self.on_close()
+        self._report_dropped(force=True)
+
+    def _report_dropped(self, force=False):
+        # put() runs on the proxy's thread and must stay cheap, so drops are reported from here
+        dropped = self.dropped - self._reported_dropped
+        now = time.time()
+        if dropped and (force or now - self._reported_at >= DROP_REPORT_SECONDS):
+            print(f"[{self._thread.name}] Queue full, dropped {dropped} items ({self.dropped} total)")
+            self._reported_dropped += dropped
+            self._reported_at = now
+
+class BufferedLogWriter(BatchWorker):
+    """
+    Shared log writer for the mitmproxy addons.
+
+    write() only enqueues the line, so the proxy never waits on disk. A background
+    thread batches lines into one write per flush, rotates the file once it passes
+    max_bytes or max_age_seconds, and gzips closed segments
+    (traffic_log.jsonl -> traffic_log.20250101-120000.jsonl.gz).
+    """
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, max_age_seconds=3600,
+                 flush_interval=0.5, batch_size=1000, max_queue=100000, compress=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.compress = compress
+
+        self._file = None
+        self._opened_at = 0.0
+        self._compressors = []
+        super().__init__("log-writer", flush_interval, batch_size, max_queue)
+
+    def write(self, line):
+        """Queues one line. Never blocks; drops the line if the writer has fallen far behind."""
+        self.put(line)
+
+    def close(self):
+        """Flushes everything still queued and closes the current segment."""
+        super().close()
+        for compressor in self._compressors:
+            compressor.join(timeout=30)
+
+    # --- Background thread ---
+
+    def process_batch(self, batch):
+        self._write_batch(batch)
+
+    def on_idle(self):
+        self._maybe_rotate()
+
+    def on_close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _write_batch(self, batch):
+        if self._file is None or self._file.closed:
+            self._open()
+        self._file.write("\n".join(batch) + "\n")
+        self._file.flush()
+        self._maybe_rotate()
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._opened_at = time.time()
+
+    def _maybe_rotate(self):
+        if self._file is None:
+            return
+        too_big = self._file.tell() >= self.max_bytes
+        too_old = time.time() - self._opened_at >= self.max_age_seconds and self._file.tell() > 0
+        if not (too_big or too_old):
+            return
+
+        base, ext = os.path.splitext(self.path)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        segment = f"{base}.{stamp}{ext}"
+        suffix = 1
+        while os.path.exists(segment) or os.path.exists(segment + ".gz"):
+            segment = f"{base}.{stamp}-{suffix}{ext}"
+            suffix += 1
+        self._file.close()
+        try:
+            os.replace(self.path, segment)
+        except OSError as e:
+            # e.g. another process holds the file open on Windows; keep appending and retry later
+            print(f"Error rotating log {self.path}: {e}")
+            self._open()
+            return
+        self._file = None
+        if self.compress:
+            self._compressors = [t for t in self._compressors if t.is_alive()]
+            compressor = threading.Thread(target=compress_segment, args=(segment,), daemon=True)
+            compressor.start()
+            self._compressors.append(compressor)
+
+def compress_segment(path):
+    """Gzips a closed log segment and removes the uncompressed file."""
+    try:
+        with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(path)
+    except Exception as e:
+        print(f"Error compressing log segment {path}: {e}")
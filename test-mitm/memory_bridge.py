@@ -0,0 +1,237 @@
+"""
+Bridge from captured AI chat traffic into the bot's memory.
+
+Run it next to the other addons:
+    mitmdump -s memory_bridge.py
+
+Prompts the user sends and answers they read on AI chat sites are reassembled by
+StreamExtractor, deduplicated by content hash, and shipped to the backend's
+/ingest-batch endpoint in batches from a background thread. While the backend is
+down, batches wait in a size-bounded spool on disk and are re-sent in order. A batch
+the backend rejects (4xx), or answers with a server error MAX_SERVER_ERRORS times in a
+row, is moved to memory_spool/rejected/ so it can't block the batches behind it.
+"""
+from mitmproxy import http
+from collections import OrderedDict
+import os
+import json
+import asyncio
+import time
+import hashlib
+import urllib.error
+import urllib.request
+from log_writer import BatchWorker
+from stream_extract import StreamExtractor
+
+# Configuration
+BACKEND_URL = os.environ.get("SUPERBOT_BACKEND_URL", "http://127.0.0.1:8000") + "/ingest-batch"
+AI_CHAT_HOSTS = ["chatgpt.com", "openai.com", "claude.ai", "gemini.google.com", "perplexity.ai"]
+SPOOL_DIR = "memory_spool"
+SPOOL_MAX_BYTES = 50 * 1024 * 1024
+REJECTED_MAX_BYTES = 10 * 1024 * 1024
+MIN_TURN_CHARS = 3
+MAX_TURN_CHARS = 8000 # Bounds request size; the backend trims each turn to the embedding token limit
+SEEN_HASHES = 10000
+MAX_SERVER_ERRORS = 5 # 5xx answers to one spooled batch before it is set aside
+
+# Outcomes of one POST to the backend: accepted, refused for good, server error, unreachable
+SENT, REJECTED, ERROR, FAILED = "sent", "rejected", "error", "failed"
+
+class MemoryShipper(BatchWorker):
+    """Posts batches of chat turns to the backend, spooling them to disk when it can't."""
+
+    def __init__(self, url=BACKEND_URL, spool_dir=SPOOL_DIR, spool_max_bytes=SPOOL_MAX_BYTES,
+                 retries=3, timeout=5.0):
+        self.url = url
+        self.spool_dir = spool_dir
+        self.spool_max_bytes = spool_max_bytes
+        self.retries = retries
+        self.timeout = timeout
+        self._retry_at = 0.0
+        self._backoff = 1.0
+        self._spool_seq = 0
+        self._errors = {} # spool path -> 5xx answers so far
+        os.makedirs(spool_dir, exist_ok=True)
+        super().__init__("memory-shipper", flush_interval=2.0, batch_size=100)
+
+    def process_batch(self, batch):
+        # Keep order: anything already spooled goes out before this batch
+        if self._spooled_files():
+            self._spool(batch)
+            self.on_idle()
+            return
+        result = self._send_with_retry(batch)
+        if result == REJECTED:
+            self._reject(batch)
+        elif result != SENT:
+            self._spool(batch)
+            self.on_idle()
+
+    def on_idle(self):
+        if time.time() < self._retry_at:
+            return
+        for path in self._spooled_files():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    items = json.load(f)
+            except (OSError, ValueError):
+                os.remove(path) # Unreadable spool file, nothing to recover
+                continue
+            result = self._send(items)
+            if result == ERROR:
+                # The backend is up but keeps failing on this batch (e.g. input the embedder refuses)
+                self._errors[path] = self._errors.get(path, 0) + 1
+                if self._errors[path] >= MAX_SERVER_ERRORS:
+                    print(f"[Memory Bridge] Setting aside {os.path.basename(path)} after {MAX_SERVER_ERRORS} server errors")
+                    result = REJECTED
+            if result in (ERROR, FAILED):
+                # Back off up to a minute between attempts while the backend stays down
+                self._retry_at = time.time() + self._backoff
+                self._backoff = min(self._backoff * 2, 60.0)
+                return
+            if result == REJECTED:
+                self._reject(items)
+            self._errors.pop(path, None)
+            os.remove(path)
+        self._backoff = 1.0
+
+    def _send(self, items):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({"items": items}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return SENT if 200 <= response.status < 300 else FAILED
+        except urllib.error.HTTPError as e:
+            # A 4xx will fail the same way every time; timeouts and rate limits are worth retrying
+            if 400 <= e.code < 500 and e.code not in (408, 429):
+                print(f"[Memory Bridge] Backend rejected batch of {len(items)}: HTTP {e.code}")
+                return REJECTED
+            print(f"[Memory Bridge] Backend error: HTTP {e.code}")
+            return ERROR if e.code >= 500 else FAILED
+        except Exception as e:
+            print(f"[Memory Bridge] Backend unavailable: {e}")
+            return FAILED
+
+    def _send_with_retry(self, items):
+        delay = 0.5
+        for attempt in range(self.retries):
+            result = self._send(items)
+            if result in (SENT, REJECTED):
+                return result
+            if attempt < self.retries - 1:
+                time.sleep(delay)
+                delay *= 2
+        return result
+
+    def _spooled_files(self, directory=None):
+        directory = directory or self.spool_dir
+        names = sorted(n for n in os.listdir(directory) if n.endswith(".json"))
+        return [os.path.join(directory, n) for n in names]
+
+    def _spool(self, items):
+        self._write(self.spool_dir, items, self.spool_max_bytes)
+
+    def _reject(self, items):
+        # Kept for inspection rather than dropped, but out of the retry path
+        self._write(os.path.join(self.spool_dir, "rejected"), items, REJECTED_MAX_BYTES)
+
+    def _write(self, directory, items, max_bytes):
+        os.makedirs(directory, exist_ok=True)
+        self._spool_seq += 1
+        path = os.path.join(directory, f"{time.time():017.6f}-{self._spool_seq:06d}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(items, f)
+
+        # Bound the directory: drop the oldest batches first
+        files = self._spooled_files(directory)
+        sizes = [os.path.getsize(p) for p in files]
+        total = sum(sizes)
+        for p, size in zip(files, sizes):
+            if total <= max_bytes:
+                break
+            os.remove(p)
+            self._errors.pop(p, None)
+            total -= size
+            print(f"[Memory Bridge] {os.path.basename(directory)} full, dropped {os.path.basename(p)}")
+
+shipper = MemoryShipper()
+seen = OrderedDict() # Recent content hashes, oldest first
+
+def on_turn(host, key, direction, text):
+    """Called by the extractor for every completed message; dedupes and queues it for shipping."""
+    text = text.strip()[:MAX_TURN_CHARS]
+    if len(text) < MIN_TURN_CHARS:
+        return
+    digest = hashlib.sha256(f"{direction}\0{text}".encode("utf-8")).hexdigest()
+    if digest in seen:
+        seen.move_to_end(digest)
+        return
+    seen[digest] = True
+    if len(seen) > SEEN_HASHES:
+        seen.popitem(last=False)
+
+    shipper.put({
+        "id": digest,
+        "text": text,
+        "host": host,
+        "direction": direction,
+        "conversation": key[1] if len(key) == 3 else "", # (host, conversation_id, direction) keys
+        "timestamp": time.time()
+    })
+
+extractor = StreamExtractor(on_message=on_turn, prose_fallback=False)
+sweeper = None
+
+def is_chat_host(flow):
+    return any(h in flow.request.pretty_host for h in AI_CHAT_HOSTS)
+
+# ----------------------------------------------------------------------
+# HOOKS (all cheap: parsing happens inline, network and disk on the shipper thread)
+# ----------------------------------------------------------------------
+def running():
+    # Completes messages on websockets that go quiet without closing
+    global sweeper
+    sweeper = asyncio.get_running_loop().create_task(extractor.run_sweeper())
+
+def request(flow: http.HTTPFlow):
+    if not is_chat_host(flow) or flow.request.method != "POST":
+        return
+    if "application/json" not in flow.request.headers.get("Content-Type", ""):
+        return
+    data = extractor.parse(flow.request.content)
+    if data is not None:
+        key = f"{flow.id}:request"
+        extractor.feed_json(key, flow.request.pretty_host, data, "out")
+        extractor.end_stream(key)
+
+def responseheaders(flow: http.HTTPFlow):
+    if not is_chat_host(flow) or "text/event-stream" not in flow.response.headers.get("Content-Type", ""):
+        return
+    flow.response.stream = extractor.stream_handler(flow)
+
+def response(flow: http.HTTPFlow):
+    # Answers arrive as streams; plain JSON responses on these hosts are mostly metadata
+    if is_chat_host(flow):
+        extractor.end_stream(flow.id)
+
+def websocket_message(flow: http.HTTPFlow):
+    if not is_chat_host(flow):
+        return
+    message = flow.websocket.messages[-1]
+    extractor.feed_message(flow.id, flow.request.pretty_host, message.content, "out" if message.from_client else "in")
+
+def websocket_end(flow: http.HTTPFlow):
+    extractor.end_stream(flow.id)
+
+def error(flow: http.HTTPFlow):
+    # Aborted flows never reach response()/websocket_end()
+    extractor.end_stream(flow.id)
+
+def done():
+    if sweeper is not None:
+        sweeper.cancel()
+    shipper.close()
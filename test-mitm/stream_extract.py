@@ -0,0 +1,288 @@
+"""
+Incremental text extraction for AI chat traffic.
+
+Chat backends stream answers as text/event-stream or as many small websocket
+frames, each carrying either a delta ("Hel", "lo") or the full text so far.
+StreamExtractor parses those chunk by chunk, reassembles one message per
+conversation (or per flow), and remembers which JSON path held the text for each
+host so later messages are a few dict lookups instead of a full walk.
+"""
+import json
+import time
+import asyncio
+from collections import OrderedDict
+
+# Common fields in AI chat APIs, in priority order
+TEXT_KEYS = ["content", "parts", "text", "delta", "completion", "v", "body", "input", "query", "prompt", "message"]
+
+MAX_PARSE_BYTES = 1024 * 1024 # Larger bodies are not JSON-parsed at all
+MAX_WALK_NODES = 500 # Budget for the recursive search when no cached path matches
+MAX_DEPTH = 12
+MAX_PATHS_PER_HOST = 8
+MAX_STREAMS = 256 # Open messages kept at once; the oldest are flushed first
+MAX_MESSAGE_CHARS = 200000
+FLOW_IDLE_SECONDS = 60.0 # SSE parsers of flows that stopped without end_stream() are dropped after this
+DONE_EVENTS = {"done", "message_stop", "response.completed", "end"}
+
+class SSEParser:
+    """
+    Parses a text/event-stream body fed in arbitrary chunks. feed() returns complete (event, data) pairs.
+    Events larger than MAX_PARSE_BYTES would not be JSON-parsed anyway, so they are skipped
+    without being buffered.
+    """
+
+    def __init__(self):
+        self.updated = time.time()
+        self._buffer = b""
+        self._event = None
+        self._data = []
+        self._size = 0
+        self._oversized = False
+
+    def feed(self, chunk):
+        self.updated = time.time()
+        self._buffer += chunk
+        lines = self._buffer.split(b"\n")
+        self._buffer = lines.pop()
+        if len(self._buffer) > MAX_PARSE_BYTES:
+            self._buffer, self._oversized = b"", True
+        events = []
+        for raw in lines:
+            line = raw.rstrip(b"\r").decode("utf-8", errors="replace")
+            if not line:
+                if self._data and not self._oversized:
+                    events.append((self._event or "message", "\n".join(self._data)))
+                self._event, self._data, self._size, self._oversized = None, [], 0, False
+            elif line.startswith(":") or self._oversized:
+                continue
+            else:
+                field, _, value = line.partition(":")
+                value = value[1:] if value.startswith(" ") else value
+                if field == "event":
+                    self._event = value
+                elif field == "data":
+                    self._size += len(value)
+                    if self._size > MAX_PARSE_BYTES:
+                        self._data, self._oversized = [], True
+                    else:
+                        self._data.append(value)
+        return events
+
+def _follow(data, path):
+    for step in path:
+        if isinstance(step, int):
+            if not isinstance(data, list) or step >= len(data):
+                return None
+        elif not isinstance(data, dict) or step not in data:
+            return None
+        data = data[step]
+    return data
+
+def _as_text(value):
+    if isinstance(value, str):
+        return value if value and not value.startswith("{") else None
+    # ChatGPT keeps message text in a list of string "parts"
+    if isinstance(value, list) and value and all(isinstance(v, str) for v in value):
+        return "".join(value) or None
+    return None
+
+def find_text(data, prose_fallback=True):
+    """
+    Bounded search for chat text. Returns (text, path) or (None, None).
+    Strings under TEXT_KEYS win; otherwise, with prose_fallback, the first prose-looking
+    string is returned with path None, so it is never learned as a path for the host.
+    """
+    stack = [(data, ())]
+    fallback = (None, None)
+    nodes = 0
+    while stack and nodes < MAX_WALK_NODES:
+        node, path = stack.pop()
+        nodes += 1
+        if isinstance(node, dict):
+            # Highest-priority text key wins, whatever order the payload lists them in
+            for key in sorted((k for k in node if k in TEXT_KEYS), key=TEXT_KEYS.index):
+                text = _as_text(node[key])
+                if text:
+                    return text, path + (key,)
+            children = list(node.items())
+            if len(path) < MAX_DEPTH:
+                # Visit text-like keys first
+                children.sort(key=lambda kv: kv[0] in TEXT_KEYS)
+                stack.extend((value, path + (key,)) for key, value in children)
+        elif isinstance(node, list):
+            if len(path) < MAX_DEPTH:
+                stack.extend((item, path + (i,)) for i, item in reversed(list(enumerate(node))))
+        elif prose_fallback and isinstance(node, str) and fallback[0] is None and " " in node and len(node) > 2 and not node.startswith("{"):
+            fallback = (node, None)
+    return fallback
+
+class StreamExtractor:
+    """
+    Reassembles chat messages from SSE bodies and websocket frames.
+
+    on_message(host, key, direction, text) is called once per completed message,
+    where direction is "in" (from the server) or "out" (typed by the user). A message
+    is complete on a done marker ([DONE], message_stop, ...), after IDLE_SECONDS without
+    new text (checked by sweep(), which run_sweeper() calls every second), or when
+    end_stream() is called for its flow. With prose_fallback=False
+    only text under known chat keys counts, which keeps titles, errors and other
+    metadata out of messages.
+    """
+
+    IDLE_SECONDS = 5.0
+
+    def __init__(self, on_message=None, prose_fallback=True):
+        self.on_message = on_message
+        self.prose_fallback = prose_fallback
+        self.paths = {} # host -> learned JSON paths, most recently used first
+        self._parsers = {} # flow key -> SSEParser
+        self._streams = OrderedDict() # stream key -> (host, direction, text so far, last update, mode), oldest update first
+        self._flow_streams = {} # flow key -> stream keys opened by that flow
+        self._flows_swept_at = time.time()
+
+    # --- JSON ---
+
+    def extract(self, host, data):
+        """Returns the chat text in a parsed JSON payload, trying this host's learned paths first."""
+        paths = self.paths.setdefault(host, [])
+        for i, path in enumerate(paths):
+            text = _as_text(_follow(data, path))
+            if text:
+                if i:
+                    paths.insert(0, paths.pop(i))
+                return text
+
+        text, path = find_text(data, self.prose_fallback)
+        if path is not None:
+            paths.insert(0, path)
+            del paths[MAX_PATHS_PER_HOST:]
+        return text
+
+    def parse(self, payload):
+        """json.loads with a size cap. Returns None for non-JSON or oversized payloads."""
+        if isinstance(payload, bytes):
+            if len(payload) > MAX_PARSE_BYTES:
+                return None
+            payload = payload.decode("utf-8", errors="replace")
+        if len(payload) > MAX_PARSE_BYTES:
+            return None
+        try:
+            return json.loads(payload)
+        except ValueError:
+            return None
+
+    # --- Streams ---
+
+    def feed_sse(self, flow_key, host, chunk, direction="in"):
+        """Feeds one chunk of a text/event-stream body."""
+        parser = self._parsers.setdefault(flow_key, SSEParser())
+        for event, data in parser.feed(chunk):
+            if data.strip() == "[DONE]":
+                self.end_stream(flow_key)
+                continue
+            parsed = self.parse(data)
+            if parsed is not None:
+                self._handle_json(flow_key, host, direction, event, parsed)
+
+    def stream_handler(self, flow):
+        """
+        Returns a callable for mitmproxy's flow.response.stream that feeds each SSE chunk
+        through feed_sse() and ends the stream on the final empty chunk. A handler another
+        addon already installed is chained, so several addons can watch the same stream.
+        """
+        flow_key, host = flow.id, flow.request.pretty_host
+        previous = flow.response.stream
+
+        def on_chunk(chunk):
+            if chunk:
+                self.feed_sse(flow_key, host, chunk)
+            else:
+                self.end_stream(flow_key)
+            return previous(chunk) if callable(previous) else chunk
+
+        return on_chunk
+
+    def feed_message(self, flow_key, host, payload, direction="in"):
+        """Feeds one websocket frame (or any standalone JSON message) belonging to a flow."""
+        data = self.parse(payload)
+        if data is not None:
+            self.feed_json(flow_key, host, data, direction)
+
+    def feed_json(self, flow_key, host, data, direction="in"):
+        """Like feed_message() for a payload the caller has already parsed. Returns the text found, if any."""
+        return self._handle_json(flow_key, host, direction, None, data)
+
+    def end_stream(self, flow_key):
+        """Completes every message still open for a flow (response finished, websocket closed)."""
+        self._parsers.pop(flow_key, None)
+        for key in self._flow_streams.pop(flow_key, ()):
+            self._finish(key)
+
+    def sweep(self, now=None):
+        """
+        Completes messages that got no new text for IDLE_SECONDS, and the oldest ones past
+        MAX_STREAMS. Every IDLE_SECONDS it also forgets flows that ended without end_stream()
+        (aborted requests, killed connections).
+        """
+        now = time.time() if now is None else now
+        while self._streams:
+            oldest_key, entry = next(iter(self._streams.items()))
+            if len(self._streams) <= MAX_STREAMS and now - entry[3] < self.IDLE_SECONDS:
+                break
+            self._finish(oldest_key)
+
+        if now - self._flows_swept_at < self.IDLE_SECONDS:
+            return
+        self._flows_swept_at = now
+        for flow_key in [k for k, parser in self._parsers.items() if now - parser.updated >= FLOW_IDLE_SECONDS]:
+            self.end_stream(flow_key)
+        for flow_key, keys in list(self._flow_streams.items()):
+            keys.intersection_update(self._streams)
+            if not keys and flow_key not in self._parsers:
+                del self._flow_streams[flow_key]
+
+    async def run_sweeper(self, interval=1.0):
+        """Calls sweep() periodically on the running event loop, so quiet websockets still complete."""
+        while True:
+            await asyncio.sleep(interval)
+            self.sweep()
+
+    def _handle_json(self, flow_key, host, direction, event, data):
+        key = (flow_key, direction)
+        done = event in DONE_EVENTS
+        if isinstance(data, dict):
+            conversation = data.get("conversation_id")
+            if isinstance(conversation, str):
+                key = (host, conversation, direction)
+            done = done or data.get("type") in DONE_EVENTS
+
+        text = self.extract(host, data)
+        if text:
+            self._append(flow_key, key, host, direction, text)
+        if done:
+            self._finish(key)
+        return text
+
+    def _append(self, flow_key, key, host, direction, text):
+        now = time.time()
+        _, _, current, _, mode = self._streams.pop(key, (host, direction, "", now, None))
+        # Some backends resend the whole message so far ("full"), others send only the new
+        # piece ("delta"). The second update of a message decides; a resend must be longer
+        # than what we have, so repeated deltas like "ha", "ha" are appended, not collapsed.
+        if mode is None and current:
+            mode = "full" if len(text) > len(current) and text.startswith(current) else "delta"
+        if mode == "full":
+            current = text
+        else:
+            current += text
+        self._streams[key] = (host, direction, current[:MAX_MESSAGE_CHARS], now, mode)
+        self._flow_streams.setdefault(flow_key, set()).add(key)
+        self.sweep(now)
+
+    def _finish(self, key):
+        entry = self._streams.pop(key, None)
+        if entry is None:
+            return
+        host, direction, text, _, _ = entry
+        if text.strip() and self.on_message:
+            self.on_message(host, key, direction, text)
@@ -0,0 +1,198 @@
+"""
+Embedded SQLite index of captured traffic, with FTS5 over bodies.
+
+universal_spy feeds it through TrafficIndexer as it logs; viewer_server queries it
+through search_traffic(). Existing logs (including rotated .gz segments) can be
+backfilled, oldest first, with:
+    python traffic_store.py import traffic_log.*.jsonl.gz traffic_log.jsonl
+
+Ids follow capture order, so search_traffic() turns time ranges into id ranges;
+backfill into a fresh database (or before live indexing starts) to keep it that way.
+"""
+import sys
+import gzip
+import json
+import sqlite3
+from datetime import datetime
+from urllib.parse import urlsplit
+from log_writer import BatchWorker
+
+DB_FILE = "traffic_index.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS traffic (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    type TEXT,
+    method TEXT,
+    status INTEGER,
+    host TEXT,
+    url TEXT,
+    content_type TEXT,
+    body TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_traffic_host ON traffic(host, id);
+CREATE INDEX IF NOT EXISTS idx_traffic_type ON traffic(type, id);
+CREATE INDEX IF NOT EXISTS idx_traffic_ts ON traffic(ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS traffic_fts USING fts5(body, host, content='traffic', content_rowid='id');
+"""
+
+COLUMNS = ["id", "ts", "type", "method", "status", "host", "url", "content_type", "body"]
+
+def connect(path=DB_FILE, readonly=False):
+    if readonly:
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL") # Readers never block the indexer
+    db.execute("PRAGMA synchronous=NORMAL")
+    fts_columns = [row[1] for row in db.execute("PRAGMA table_info(traffic_fts)")]
+    if fts_columns and "host" not in fts_columns:
+        # Databases from before host was indexed for text search: rebuild the FTS table from traffic
+        print("[Traffic Store] Rebuilding full-text index with host column...")
+        db.execute("DROP TABLE traffic_fts")
+        db.executescript(SCHEMA)
+        db.execute("INSERT INTO traffic_fts (traffic_fts) VALUES ('rebuild')")
+        db.commit()
+    db.executescript(SCHEMA)
+    return db
+
+def to_row(record):
+    """Maps a universal_spy log record to a traffic row (without id)."""
+    ts = record.get("ts")
+    if ts is None:
+        try:
+            ts = datetime.strptime(record.get("timestamp", ""), "%Y-%m-%d %H:%M:%S").timestamp()
+        except ValueError:
+            ts = 0.0
+    url = record.get("url", "")
+    return (
+        ts,
+        record.get("type"),
+        record.get("method"),
+        record.get("status"),
+        urlsplit(url).hostname or "",
+        url,
+        record.get("content_type"),
+        record.get("body") or "",
+    )
+
+def insert_records(db, records):
+    """Inserts records and their FTS entries in one transaction."""
+    db.execute("BEGIN IMMEDIATE") # Take the write lock before reading MAX(id)
+    try:
+        next_id = db.execute("SELECT COALESCE(MAX(id), 0) FROM traffic").fetchone()[0] + 1
+        rows = [(next_id + i,) + to_row(record) for i, record in enumerate(records)]
+        db.executemany(f"INSERT INTO traffic ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+        db.executemany("INSERT INTO traffic_fts (rowid, body, host) VALUES (?, ?, ?)", [(row[0], row[-1], row[5]) for row in rows])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+def fts_query(text):
+    """Turns free text into an FTS5 query that matches all words, with no operator surprises."""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+def first_id_at(db, ts):
+    """Id of the first record at or after ts (None if there is none), via the ts index."""
+    row = db.execute("SELECT id FROM traffic WHERE ts >= ? ORDER BY ts LIMIT 1", (ts,)).fetchone()
+    return row[0] if row else None
+
+def search_traffic(db, q=None, host=None, type=None, status=None, since=None, until=None, limit=50, cursor=None):
+    """
+    Newest-first search. Pass the returned next_cursor back as `cursor` for the next page;
+    keyset pagination keeps deep pages as fast as the first one.
+    """
+    where, params = [], []
+    match = fts_query(q) if q else "" # Blank or whitespace-only q means no text filter
+    if match:
+        source = "traffic_fts f JOIN traffic t ON t.id = f.rowid"
+        if host is not None:
+            # Let FTS intersect with the host's postings, so a rare host doesn't walk every text hit
+            match = f"host : {fts_query(host)} AND body : ({match})"
+        else:
+            match = f"body : ({match})"
+        where.append("traffic_fts MATCH ?")
+        params.append(match)
+        order = "f.rowid"
+    else:
+        source = "traffic t"
+        order = "t.id"
+    for column, value in (("host", host), ("type", type), ("status", status)):
+        if value is not None:
+            where.append(f"t.{column} = ?")
+            params.append(value)
+    # Time bounds become id bounds, so the newest-first walk stays on the id order; the
+    # ts checks are unary-plus'd so SQLite doesn't pick the ts index and sort the range
+    if since is not None:
+        low = first_id_at(db, since)
+        if low is None:
+            return {"items": [], "next_cursor": None}
+        where.append(f"{order} >= ? AND +t.ts >= ?")
+        params.extend([low, since])
+    if until is not None:
+        high = first_id_at(db, until)
+        if high is not None:
+            where.append(f"{order} < ?")
+            params.append(high)
+        where.append("+t.ts < ?")
+        params.append(until)
+    if cursor is not None:
+        where.append(f"{order} < ?")
+        params.append(cursor)
+
+    sql = f"SELECT {', '.join('t.' + c for c in COLUMNS)} FROM {source}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {order} DESC LIMIT ?"
+    params.append(limit)
+
+    items = [dict(zip(COLUMNS, row)) for row in db.execute(sql, params)]
+    next_cursor = items[-1]["id"] if len(items) == limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+class TrafficIndexer(BatchWorker):
+    """Indexes log records into the traffic store in batched transactions on a background thread."""
+
+    def __init__(self, path=DB_FILE, flush_interval=1.0, batch_size=500):
+        self.path = path
+        self._db = None
+        super().__init__("traffic-indexer", flush_interval, batch_size)
+
+    def process_batch(self, batch):
+        if self._db is None:
+            self._db = connect(self.path) # Created on the worker thread that uses it
+        insert_records(self._db, batch)
+
+    def on_close(self):
+        if self._db:
+            self._db.close()
+            self._db = None
+
+def import_logs(paths, db_path=DB_FILE, batch_size=10000):
+    db = connect(db_path)
+    total = 0
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        batch = []
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    batch.append(json.loads(line))
+                except ValueError:
+                    continue
+                if len(batch) >= batch_size:
+                    insert_records(db, batch)
+                    total += len(batch)
+                    batch = []
+        if batch:
+            insert_records(db, batch)
+            total += len(batch)
+        print(f"Indexed {path} ({total} records so far)")
+    db.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] != "import":
+        print("Usage: python traffic_store.py import <log.jsonl[.gz]> [...]")
+        sys.exit(1)
+    import_logs(sys.argv[2:])
@@ -2,6 +2,8 @@ from mitmproxy import http, websocket
 from datetime import datetime
 import json
 import logging
+from log_writer import BufferedLogWriter
+from traffic_store import TrafficIndexer
 
 # Configuration
 LOG_FILE = "traffic_log.jsonl"
@@ -14,29 +16,27 @@ print("🚀 UNIVERSAL SPY IS RUNNING")
 print("Logging organized traffic to console and file...")
 print("="*50 + "\n")
 
-# Helper: Log to file as JSON Line
+# Batches, rotates and compresses the log on a background thread
+log_writer = BufferedLogWriter(LOG_FILE)
+# Searchable SQLite index of the same records, served by viewer_server's /api/search
+traffic_index = TrafficIndexer()
+
+# Helper: Log to file as compact JSON Line (bodies are stored as captured, not re-serialized)
 def log_to_file(data_dict):
     data_dict["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    try:
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(json.dumps(data_dict) + "\n")
-    except Exception as e:
-        print(f"Error writing to log file: {e}")
+    log_writer.write(json.dumps(data_dict, separators=(",", ":")))
+    traffic_index.put(data_dict)
 
 # Helper: Check if content is text-based
 def is_text_content(headers):
     content_type = headers.get("Content-Type", "").lower()
     return any(t in content_type for t in ["text", "json", "xml", "javascript", "urlencoded"])
 
-# Helper: Pretty print content (JSON or Text)
-def format_content(content):
-    try:
-        # Try to parse and pretty-print JSON
-        json_obj = json.loads(content)
-        return json.dumps(json_obj, indent=2)
-    except:
-        # Return raw text if not JSON
-        return content
+# Helper: Print the start of a body to the console.
+# Only a raw slice is shown; parsing and re-indenting large bodies would stall the proxy.
+def print_body(content, limit):
+    print(content[:limit])
+    if len(content) > limit: print(f"\n... [Truncated {len(content)-limit} chars]")
 
 # ----------------------------------------------------------------------
 # HTTP HANDLERS
@@ -49,15 +49,12 @@ def request(flow: http.HTTPFlow):
         content = flow.request.text
         if not content: return
 
-        pretty_body = format_content(content)
-        
         # Console Output
         print(f"\n{'='*20} [>>> OUTGOING REQUEST] {'='*20}")
         print(f"URL: {flow.request.method} {flow.request.pretty_url}")
         print(f"Type: {flow.request.headers.get('Content-Type', 'unknown')}")
         print("-" * 60)
-        print(f"{pretty_body[:2000]}") # Show more chars but truncate nicely
-        if len(pretty_body) > 2000: print(f"\n... [Truncated {len(pretty_body)-2000} chars]")
+        print_body(content, 2000)
         print("="*60)
 
         # File Log
@@ -66,7 +63,7 @@ def request(flow: http.HTTPFlow):
             "method": flow.request.method,
             "url": flow.request.pretty_url,
             "content_type": flow.request.headers.get('Content-Type', 'unknown'),
-            "body": pretty_body
+            "body": content
         })
 
     except:
@@ -80,15 +77,12 @@ def response(flow: http.HTTPFlow):
         content = flow.response.text
         if not content: return
 
-        pretty_body = format_content(content)
-        
         # Console Output
         print(f"\n{'='*20} [<<< INCOMING RESPONSE] {'='*20}")
         print(f"URL: {flow.response.status_code} {flow.request.pretty_url}")
         print(f"Type: {flow.response.headers.get('Content-Type', 'unknown')}")
         print("-" * 60)
-        print(f"{pretty_body[:2000]}")
-        if len(pretty_body) > 2000: print(f"\n... [Truncated {len(pretty_body)-2000} chars]")
+        print_body(content, 2000)
         print("="*60)
 
         # File Log
@@ -97,7 +91,7 @@ def response(flow: http.HTTPFlow):
             "status": flow.response.status_code,
             "url": flow.request.pretty_url,
             "content_type": flow.response.headers.get('Content-Type', 'unknown'),
-            "body": pretty_body
+            "body": content
         })
         
     except:
@@ -113,21 +107,24 @@ def websocket_message(flow: http.HTTPFlow):
         if isinstance(content, bytes):
             content = content.decode('utf-8')
         
-        pretty_body = format_content(content)
         direction = "WS_OUT" if message.from_client else "WS_IN" # Machine readable code
         display_dir = ">> WS SENT" if message.from_client else "<< WS RECV"
         
         # Console Output
         print(f"\n[{display_dir}] {flow.request.pretty_host}")
-        print(f"{pretty_body[:1000]}")
-        if len(pretty_body) > 1000: print("...")
+        print_body(content, 1000)
 
         # File Log
         log_to_file({
             "type": direction,
             "url": flow.request.pretty_url,
-            "body": pretty_body
+            "body": content
         })
             
     except:
         pass
+
+# Flush queued log lines and index rows when mitmproxy shuts down
+def done():
+    log_writer.close()
+    traffic_index.close()
@@ -1,14 +1,35 @@
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
+from typing import Optional
 import os
 import json
 import asyncio
 import time
+from log_tail import LogTailer, read_lines_before, read_lines_after
+from traffic_store import DB_FILE, connect, search_traffic
 
 app = FastAPI()
 templates = Jinja2Templates(directory="templates")
 LOG_FILE = "traffic_log.jsonl"
+KEEPALIVE_SECONDS = 15
+
+# One reader for the log file, shared by every /api/logs client
+tailer = LogTailer(LOG_FILE)
+
+@app.on_event("startup")
+async def start_tailer():
+    tailer.start()
+
+@app.on_event("startup")
+def upgrade_index():
+    # Searches open the index read-only, so apply any schema upgrade once up front
+    if os.path.exists(DB_FILE):
+        connect(DB_FILE).close()
+
+@app.on_event("shutdown")
+async def stop_tailer():
+    await tailer.stop()
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
@@ -17,44 +38,65 @@ async def read_root(request: Request):
 @app.get("/api/logs")
 async def stream_logs():
     async def log_generator():
-        # Start reading from the end of the file initially? 
-        # Or just stream everything since startup.
-        # For simplicity, let's stream logs as they come in.
-        
-        # Ensure file exists
-        if not os.path.exists(LOG_FILE):
-             with open(LOG_FILE, 'w') as f: f.write("")
-        
-        f = open(LOG_FILE, "r", encoding="utf-8")
-        # Go to end of file to stream only NEW logs
-        f.seek(0, os.SEEK_END)
-        
-        while True:
-            line = f.readline()
-            if line:
-                yield f"data: {line}\n\n"
-            else:
-                await asyncio.sleep(0.1)
+        q = tailer.subscribe()
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(q.get(), KEEPALIVE_SECONDS)
+                    yield f"data: {line}\n\n"
+                except asyncio.TimeoutError:
+                    # SSE comment; also lets us notice a client that went away
+                    yield ": keepalive\n\n"
+        finally:
+            tailer.unsubscribe(q)
 
     return StreamingResponse(log_generator(), media_type="text/event-stream")
 
 @app.get("/api/history")
-async def get_history():
-    """Returns the last 50 logs for initial load."""
+def get_history(limit: int = 50, before: Optional[int] = None, after: Optional[int] = None):
+    """
+    Returns up to `limit` logs, oldest first; defaults to the last 50 for initial load.
+    Each entry carries its byte `offset` in the log. Page backward with ?before=<offset of the
+    first entry> and forward with ?after=<offset of the last entry + 1>.
+    """
     if not os.path.exists(LOG_FILE):
         return []
-    
+
+    limit = max(1, min(limit, 1000))
+    if after is not None:
+        lines = read_lines_after(LOG_FILE, limit, after)
+    else:
+        lines = read_lines_before(LOG_FILE, limit, before)
+
     logs = []
-    with open(LOG_FILE, "r", encoding="utf-8") as f:
-        # Read all lines is risky if file is huge, but fine for local tool
-        lines = f.readlines()
-        for line in lines[-50:]: # Last 50 items
-            try:
-                logs.append(json.loads(line))
-            except:
-                pass
+    for offset, line in lines:
+        try:
+            entry = json.loads(line)
+            entry["offset"] = offset
+            logs.append(entry)
+        except:
+            pass
     return logs
 
+@app.get("/api/search")
+def search(q: Optional[str] = None, host: Optional[str] = None, type: Optional[str] = None,
+           status: Optional[int] = None, since: Optional[float] = None, until: Optional[float] = None,
+           limit: int = 50, cursor: Optional[int] = None):
+    """
+    Searches the traffic index written by universal_spy.py, newest first.
+    `q` is full-text over bodies; host/type/status/since/until (epoch seconds) filter.
+    Page with ?cursor=<next_cursor from the previous response>.
+    """
+    if not os.path.exists(DB_FILE):
+        return {"items": [], "next_cursor": None}
+
+    db = connect(DB_FILE, readonly=True)
+    try:
+        return search_traffic(db, q=q, host=host, type=type, status=status, since=since, until=until,
+                              limit=max(1, min(limit, 500)), cursor=cursor)
+    finally:
+        db.close()
+
 if __name__ == "__main__":
     import uvicorn
     print("🚀 Viewer running at http://localhost:8000")